@@ -2,13 +2,15 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
 import socket, time, psutil
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import traceback
+from app.events import event_buffer, threat_classifier, decode_body, parse_ndjson, flush_events, PayloadError, PayloadTooLargeError, BufferFullError, MAX_BODY_BYTES, MAX_REPORTED_ERRORS
 
 router = APIRouter()
 
@@ -27,3 +29,75 @@ def get_metrics():
     }
 
 
+def _ingest(body: bytes, content_encoding, classify: bool):
+    events, errors = parse_ndjson(decode_body(body, content_encoding))
+    if classify and events:
+        # Only score events the buffer will keep; re-sent batches skip inference
+        fresh = event_buffer.unseen(events)
+        threat_classifier.classify(fresh)
+        accepted, _ = event_buffer.add(fresh)
+        return accepted, len(events) - accepted, errors
+    accepted, duplicates = event_buffer.add(events)
+    return accepted, duplicates, errors
+
+
+async def _read_body(request: Request) -> bytes:
+    """Reads the request body, refusing it as soon as it grows past MAX_BODY_BYTES."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+        raise PayloadTooLargeError(f"Payload exceeds {MAX_BODY_BYTES} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_BYTES:
+            raise PayloadTooLargeError(f"Payload exceeds {MAX_BODY_BYTES} bytes")
+    return bytes(body)
+
+
+# Bulk event ingestion (gzip-compressed NDJSON, one event per line)
+@router.post("/events/bulk", status_code=202)
+async def ingest_events_bulk(request: Request, background_tasks: BackgroundTasks, classify: bool = False):
+    try:
+        body = await _read_body(request)
+        accepted, duplicates, errors = await run_in_threadpool(
+            _ingest, body, request.headers.get("content-encoding"), classify
+        )
+    except PayloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except PayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (FileNotFoundError, BufferFullError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if event_buffer.should_flush():
+        background_tasks.add_task(flush_events)
+
+    return {
+        "accepted": accepted,
+        "duplicates": duplicates,
+        "invalid": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "buffered": len(event_buffer),
+    }
+
+
+
+@router.get("/events/stats")
+def get_event_stats():
+    return event_buffer.stats()
+
+
+# Scheduled pipeline jobs (see app/scheduler.py)
+@router.get("/jobs")
+def list_jobs(request: Request):
+    return [job.to_dict() for job in request.app.state.scheduler.jobs.values()]
+
+
+@router.post("/jobs/{name}/run", status_code=202)
+async def run_job(name: str, request: Request):
+    scheduler = request.app.state.scheduler
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{name}'")
+    if not scheduler.trigger(name):
+        raise HTTPException(status_code=409, detail=f"Job '{name}' is already queued or running")
+    return scheduler.jobs[name].to_dict()
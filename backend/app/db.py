@@ -0,0 +1,23 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env.local"
+# Loaded once, on first import: app.storage imports this module before app.events,
+# app.scheduler and the pipeline scripts read their settings from the environment
+load_dotenv(dotenv_path=ENV_PATH)
+
+
+@lru_cache(maxsize=1)
+def get_supabase_client() -> Client:
+    """Returns the process-wide Supabase client, created on first use."""
+    SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+    SUPABASE_KEY = os.getenv("SUPABASE_KEY") or os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("Supabase credentials not found in .env.local")
+
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
@@ -0,0 +1,278 @@
+import datetime
+import json
+import os
+import threading
+import traceback
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from app.storage import get_storage
+
+# Rows per INSERT sent to Supabase
+BATCH_SIZE = int(os.getenv("EVENTS_BATCH_SIZE", "1000"))
+# Seconds between background flushes of a partially filled buffer
+FLUSH_INTERVAL = int(os.getenv("EVENTS_FLUSH_INTERVAL", "5"))
+# Events held in memory before /events/bulk starts answering 503
+MAX_PENDING = int(os.getenv("EVENTS_MAX_PENDING", "200000"))
+# Failed inserts of the same batch before it is moved to the dead-letter file
+MAX_FLUSH_ATTEMPTS = int(os.getenv("EVENTS_MAX_FLUSH_ATTEMPTS", "5"))
+DEAD_LETTER_PATH = Path(
+    os.getenv("EVENTS_DEAD_LETTER_PATH") or Path(__file__).resolve().parents[1] / "data" / "dead_letter_events.ndjson"
+)
+# How many (ServerName, RecordId) keys are remembered for deduplication
+SEEN_CAPACITY = int(os.getenv("EVENTS_SEEN_CAPACITY", "200000"))
+# Upper bound on a request body, both as sent and once decompressed (guards against gzip bombs)
+MAX_BODY_BYTES = int(os.getenv("EVENTS_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+# Maximum number of per-line validation errors echoed back to the client
+MAX_REPORTED_ERRORS = 20
+
+# Largest value a bigint / SQLite INTEGER column can hold
+BIGINT_MAX = 2 ** 63 - 1
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "scripts"
+MODEL_PATH = SCRIPTS_DIR / "logreg_model.pkl"
+VECTORIZER_PATH = SCRIPTS_DIR / "tfidf_vectorizer.pkl"
+
+
+class SecurityEvent(BaseModel):
+    """One Windows event as produced by ExportSecurityLogs.ps1."""
+    ServerName: str = Field(min_length=1)
+    # Bounded to a signed 64-bit integer so out-of-range values fail per line, not in the batch insert
+    RecordId: int = Field(ge=0, le=BIGINT_MAX)
+    Id: int = Field(ge=0, le=BIGINT_MAX)
+    LevelDisplayName: Optional[str] = None
+    ProviderName: Optional[str] = None
+    Message: str = ""
+    is_threat: int = 0
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+    )
+    # Set when the threat model has scored the event, inline or by is_threat.py
+    classified_at: Optional[datetime.datetime] = None
+
+    @property
+    def key(self):
+        return (self.ServerName, self.RecordId)
+
+
+class PayloadError(ValueError):
+    """Raised when a request body cannot be decoded at all."""
+
+
+class PayloadTooLargeError(PayloadError):
+    """Raised when a request body, raw or decompressed, exceeds MAX_BODY_BYTES."""
+
+
+class BufferFullError(RuntimeError):
+    """Raised when accepting a request would grow the buffer past MAX_PENDING."""
+
+
+def decode_body(body: bytes, content_encoding: Optional[str] = None) -> str:
+    """Inflates a gzip body (by header or magic bytes) and returns it as text."""
+    if (content_encoding or "").lower() == "gzip" or body[:2] == b"\x1f\x8b":
+        inflater = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        try:
+            raw = inflater.decompress(body, MAX_BODY_BYTES)
+        except zlib.error as e:
+            raise PayloadError(f"Invalid gzip payload: {e}")
+        if inflater.unconsumed_tail:
+            raise PayloadTooLargeError(f"Decompressed payload exceeds {MAX_BODY_BYTES} bytes")
+    elif len(body) > MAX_BODY_BYTES:
+        raise PayloadTooLargeError(f"Payload exceeds {MAX_BODY_BYTES} bytes")
+    else:
+        raw = body
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise PayloadError(f"Payload is not valid UTF-8: {e}")
+
+
+def parse_ndjson(text: str):
+    """Validates each NDJSON line; returns (events, errors) without stopping on bad lines."""
+    events, errors = [], []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            events.append(SecurityEvent.model_validate(json.loads(line)))
+        except (json.JSONDecodeError, ValidationError) as e:
+            errors.append({"line": line_no, "error": str(e).splitlines()[0]})
+    return events, errors
+
+
+class ThreatClassifier:
+    """Wraps the TF-IDF + logistic regression model used by is_threat.py, loaded once."""
+
+    def __init__(self, model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH):
+        self.model_path = Path(model_path)
+        self.vectorizer_path = Path(vectorizer_path)
+        self._model = None
+        self._vectorizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                import joblib
+
+                if not self.model_path.exists():
+                    raise FileNotFoundError(f"Model file not found at {self.model_path}")
+                if not self.vectorizer_path.exists():
+                    raise FileNotFoundError(f"Vectorizer file not found at {self.vectorizer_path}")
+                self._vectorizer = joblib.load(self.vectorizer_path)
+                self._model = joblib.load(self.model_path)
+
+    def predict(self, messages):
+        """Returns one 0/1 label per message from a single vectorized predict call; empty messages are 0."""
+        labels = [0] * len(messages)
+        scored = [i for i, m in enumerate(messages) if isinstance(m, str) and m.strip()]
+        if scored:
+            self._load()
+            predictions = self._model.predict(self._vectorizer.transform([messages[i] for i in scored]))
+            for i, prediction in zip(scored, predictions):
+                labels[i] = int(prediction)
+        return labels
+
+    def classify(self, events):
+        """Sets is_threat and classified_at on every event."""
+        classified_at = datetime.datetime.now(datetime.timezone.utc)
+        for event, label in zip(events, self.predict([e.Message for e in events])):
+            event.is_threat = label
+            event.classified_at = classified_at
+        return events
+
+
+class EventBuffer:
+    """Deduplicates incoming events and writes them to event_logs in large batches.
+
+    A batch that keeps failing is appended to the dead-letter file after
+    MAX_FLUSH_ATTEMPTS so it cannot block the batches queued behind it.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, seen_capacity=SEEN_CAPACITY, max_pending=MAX_PENDING,
+                 max_attempts=MAX_FLUSH_ATTEMPTS, dead_letter_path=DEAD_LETTER_PATH):
+        self.batch_size = batch_size
+        self.seen_capacity = seen_capacity
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.dead_letter_path = Path(dead_letter_path)
+        self._pending = []
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Consecutive failures of the batch at the head of the buffer
+        self._head_failures = 0
+        self.inserted_total = 0
+        self.dead_lettered_total = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def unseen(self, events):
+        """Returns the events that are neither already buffered/stored nor repeated in `events`."""
+        fresh, keys = [], set()
+        with self._lock:
+            for event in events:
+                key = event.key
+                if key in self._seen or key in keys:
+                    continue
+                keys.add(key)
+                fresh.append(event)
+        return fresh
+
+    def add(self, events):
+        """Buffers events not seen before; returns (accepted, duplicates).
+
+        Raises BufferFullError without buffering anything when the new events
+        would not fit, so the client keeps them and retries.
+        """
+        accepted = duplicates = 0
+        with self._lock:
+            fresh, keys = [], set()
+            for event in events:
+                key = event.key
+                if key in self._seen:
+                    self._seen.move_to_end(key)
+                    duplicates += 1
+                    continue
+                if key in keys:
+                    duplicates += 1
+                    continue
+                keys.add(key)
+                fresh.append(event)
+            if len(self._pending) + len(fresh) > self.max_pending:
+                raise BufferFullError(
+                    f"Event buffer holds {len(self._pending)} of {self.max_pending} events, retry later"
+                )
+            for event in fresh:
+                self._seen[event.key] = None
+                self._pending.append(event.model_dump(mode="json"))
+                accepted += 1
+            while len(self._seen) > self.seen_capacity:
+                self._seen.popitem(last=False)
+        return accepted, duplicates
+
+    def should_flush(self):
+        return len(self._pending) >= self.batch_size
+
+    def stats(self):
+        return {
+            "buffered": len(self._pending),
+            "max_pending": self.max_pending,
+            "inserted_total": self.inserted_total,
+            "dead_lettered_total": self.dead_lettered_total,
+        }
+
+    def _dead_letter(self, batch, error):
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for row in batch:
+                f.write(json.dumps({"error": error, "event": row}) + "\n")
+        self.dead_lettered_total += len(batch)
+        print(f"☠️ Moved {len(batch)} events to {self.dead_letter_path} after {self.max_attempts} failed inserts: {error}")
+
+    def flush(self, storage, blocking=True):
+        """Inserts everything buffered so far; failed batches are put back at the front."""
+        if not self._flush_lock.acquire(blocking=blocking):
+            return 0
+        try:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            written = 0
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    storage.insert_events(batch)
+                except Exception as e:
+                    self._head_failures += 1
+                    if self._head_failures < self.max_attempts:
+                        with self._lock:
+                            self._pending[:0] = rows[start:]
+                        raise
+                    self._dead_letter(batch, f"{type(e).__name__}: {e}")
+                    self._head_failures = 0
+                    continue
+                self._head_failures = 0
+                written += len(batch)
+                self.inserted_total += len(batch)
+            return written
+        finally:
+            self._flush_lock.release()
+
+
+event_buffer = EventBuffer()
+threat_classifier = ThreatClassifier()
+
+
+def flush_events(blocking=False):
+    """Flushes the shared buffer to storage, printing errors instead of raising."""
+    try:
+        return event_buffer.flush(get_storage(), blocking=blocking)
+    except Exception:
+        traceback.print_exc()
+        return 0
@@ -1,13 +1,21 @@
+from app import db  # noqa: F401  loads .env.local before the modules below read their settings
 from fastapi import FastAPI
-from fastapi_utils.tasks import repeat_every
 from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
 from app.api.routes import router
+from app.events import event_buffer, flush_events
+from app.scheduler import build_scheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    app.state.scheduler = build_scheduler()
+    app.state.scheduler.start()
     yield  # continue app
-    # (optional: cleanup code after yield)
+    await app.state.scheduler.stop()
+    # Write whatever is still buffered before shutting down
+    if len(event_buffer):
+        await run_in_threadpool(flush_events, True)
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(router, prefix="/api")  # 👈 Pass the router as first arg
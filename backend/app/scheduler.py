@@ -0,0 +1,205 @@
+import asyncio
+import datetime
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.storage import get_storage
+from app.events import event_buffer, FLUSH_INTERVAL
+
+# The pipeline scripts import each other as top-level modules (see run_scripts.bat)
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.append(str(SCRIPTS_DIR))
+
+# Maximum number of jobs running at the same time across the whole scheduler
+MAX_CONCURRENT_JOBS = int(os.getenv("SCHEDULER_MAX_CONCURRENT_JOBS", "2"))
+# Granularity of the scheduler loop, in seconds
+TICK_SECONDS = 1
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class Job:
+    """A periodic job made of one or more stages that run in order, in a worker thread."""
+
+    def __init__(self, name, stages, interval, run_on_start=True, enabled=True, concurrency_limited=True):
+        self.name = name
+        self.stages = stages
+        self.interval = interval
+        self.enabled = enabled
+        # Cheap housekeeping jobs opt out so long pipeline runs cannot starve them
+        self.concurrency_limited = concurrency_limited
+        # "idle", "queued" (waiting for a concurrency slot) or "running"
+        self.state = "idle"
+        self.run_count = 0
+        self.last_status = None
+        self.last_error = None
+        self.last_result = None
+        self.last_started_at = None
+        self.last_finished_at = None
+        self.last_duration = None
+        self.next_run_at = _utcnow() if run_on_start else _utcnow() + datetime.timedelta(seconds=interval)
+
+    def is_due(self, now):
+        return self.enabled and self.state == "idle" and now >= self.next_run_at
+
+    def run_stages(self):
+        """Runs every stage with the shared storage backend; returns each stage's result."""
+        storage = get_storage()
+        return {stage.__name__: stage(storage) for stage in self.stages}
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "stages": [stage.__name__ for stage in self.stages],
+            "interval_seconds": self.interval,
+            "enabled": self.enabled,
+            "concurrency_limited": self.concurrency_limited,
+            "state": self.state,
+            "run_count": self.run_count,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_result": self.last_result,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_duration_seconds": self.last_duration,
+            "next_run_at": self.next_run_at.isoformat() if self.enabled else None,
+        }
+
+
+class Scheduler:
+    """Runs due jobs concurrently, never overlapping a job with itself."""
+
+    def __init__(self, max_concurrent_jobs=MAX_CONCURRENT_JOBS):
+        self.jobs = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent_jobs)
+        self._tasks = {}
+        self._loop_task = None
+
+    def add(self, job):
+        self.jobs[job.name] = job
+        return job
+
+    def trigger(self, name):
+        """Starts a job now; returns False if it is already queued or running."""
+        job = self.jobs[name]
+        if job.state != "idle":
+            return False
+        self._start(job)
+        return True
+
+    def _start(self, job):
+        # Leave "idle" before the task is scheduled so the next tick cannot start it twice
+        job.state = "queued"
+        task = asyncio.create_task(self._run(job))
+        self._tasks[task] = job
+        task.add_done_callback(lambda t: self._tasks.pop(t, None))
+
+    async def _run(self, job):
+        try:
+            if job.concurrency_limited:
+                async with self._semaphore:
+                    await self._execute(job)
+            else:
+                await self._execute(job)
+        finally:
+            job.next_run_at = _utcnow() + datetime.timedelta(seconds=job.interval)
+            job.state = "idle"
+
+    async def _execute(self, job):
+        job.state = "running"
+        job.last_started_at = _utcnow()
+        started = time.perf_counter()
+        try:
+            job.last_result = await run_in_threadpool(job.run_stages)
+            job.last_status = "ok"
+            job.last_error = None
+        except Exception as e:
+            traceback.print_exc()
+            job.last_status = "error"
+            job.last_error = f"{type(e).__name__}: {e}"
+        job.last_duration = round(time.perf_counter() - started, 3)
+        job.last_finished_at = _utcnow()
+        job.run_count += 1
+
+    async def _loop(self):
+        while True:
+            now = _utcnow()
+            for job in self.jobs.values():
+                if job.is_due(now):
+                    self._start(job)
+            await asyncio.sleep(TICK_SECONDS)
+
+    def start(self):
+        self._loop_task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stops scheduling new runs, drops queued ones and waits for the running ones to finish."""
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+        for task, job in list(self._tasks.items()):
+            if job.state == "queued":
+                task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _interval(name, default):
+    return int(os.getenv(f"JOB_{name.upper()}_INTERVAL", str(default)))
+
+
+# Stages import the scripts lazily so heavy dependencies (torch, sklearn, pandas)
+# are only paid for once, on the first run, and never at app start-up.
+
+def flush_event_buffer(storage):
+    return event_buffer.flush(storage, blocking=False) if len(event_buffer) else 0
+
+
+def collect_files(storage):
+    import file_collector
+
+    return file_collector.run(os.environ["FILE_COLLECTOR_PATH"], storage)
+
+
+def decide_deletions(storage):
+    import deletion_decider
+
+    return deletion_decider.main(storage)
+
+
+def classify_threats(storage):
+    import is_threat
+
+    return is_threat.run(storage)
+
+
+def forecast_metrics(storage):
+    import forecast
+
+    return forecast.main(storage)
+
+
+def build_scheduler():
+    """Creates the default scheduler; the file scan only runs when FILE_COLLECTOR_PATH is set."""
+    scheduler = Scheduler()
+    file_stages = [decide_deletions]
+    if os.getenv("FILE_COLLECTOR_PATH"):
+        file_stages.insert(0, collect_files)
+
+    scheduler.add(Job("event_flush", [flush_event_buffer], FLUSH_INTERVAL, run_on_start=False, concurrency_limited=False))
+    scheduler.add(Job("files", file_stages, _interval("files", 3600)))
+    scheduler.add(Job("threats", [classify_threats], _interval("threats", 300)))
+    # Not on start: a fresh process should not rewrite the forecast before new metrics arrive
+    scheduler.add(Job("forecast", [forecast_metrics], _interval("forecast", 900), run_on_start=False))
+    return scheduler
@@ -0,0 +1,361 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+
+from app import db  # noqa: F401  loads .env.local
+
+# "supabase" (default) or "sqlite"
+STORAGE_BACKEND_ENV = "STORAGE_BACKEND"
+SQLITE_PATH_ENV = "SQLITE_PATH"
+DEFAULT_SQLITE_PATH = Path(__file__).resolve().parents[1] / "data" / "monitoring.db"
+
+# Rows per upsert / values per `in` filter; keeps PostgREST URLs well under length limits
+SUPABASE_CHUNK_SIZE = 200
+
+
+class Storage(ABC):
+    """Operations the pipeline scripts and the backend perform on the monitoring tables."""
+
+    # servers
+    @abstractmethod
+    def get_or_create_server(self, name):
+        ...
+
+    @abstractmethod
+    def list_servers(self):
+        ...
+
+    # files / file_status
+    @abstractmethod
+    def list_files(self, columns="*"):
+        ...
+
+    @abstractmethod
+    def upsert_files(self, records):
+        """Inserts or updates files by path; returns (inserted, updated)."""
+
+    @abstractmethod
+    def upsert_file_status(self, records):
+        """Inserts or updates file_status by path; returns (inserted, updated)."""
+
+    # server_metrics
+    @abstractmethod
+    def insert_server_metrics(self, rows):
+        ...
+
+    @abstractmethod
+    def recent_server_metrics(self, limit=5000):
+        """Latest metrics rows first."""
+
+    # event_logs
+    @abstractmethod
+    def insert_events(self, rows):
+        """Inserts events, skipping any (ServerName, RecordId) already stored."""
+
+    @abstractmethod
+    def fetch_unclassified_events(self, limit=100):
+        """Oldest events with a RecordId that have never been classified (classified_at is NULL)."""
+
+    @abstractmethod
+    def mark_events_classified(self, keys, is_threat):
+        """Sets is_threat and classified_at on the events identified by (ServerName, RecordId) pairs."""
+
+
+class SupabaseStorage(Storage):
+    """Hosted Postgres backend; apply migrations/001_storage.sql to the project first."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from app.db import get_supabase_client
+
+            client = get_supabase_client()
+        self.client = client
+
+    def get_or_create_server(self, name):
+        response = self.client.table("servers").select("id").eq("name", name).execute()
+        if response.data:
+            return response.data[0]["id"]
+        insert_response = self.client.table("servers").insert({"name": name}).execute()
+        return insert_response.data[0]["id"]
+
+    def list_servers(self):
+        return self.client.table("servers").select("id, name").execute().data or []
+
+    def list_files(self, columns="*"):
+        return self.client.table("files").select(columns).execute().data or []
+
+    def _upsert_by_path(self, table, records):
+        # Needs the UNIQUE (path) constraint from migrations/001_storage.sql
+        inserted = updated = 0
+        for start in range(0, len(records), SUPABASE_CHUNK_SIZE):
+            chunk = records[start:start + SUPABASE_CHUNK_SIZE]
+            paths = [r["path"] for r in chunk]
+            # Only used for the inserted/updated counts; the write itself is one request
+            existing = self.client.table(table).select("path").in_("path", paths).execute()
+            existing_paths = {row["path"] for row in existing.data or []}
+            self.client.table(table).upsert(
+                chunk, on_conflict="path", returning="minimal", default_to_null=False
+            ).execute()
+            updated += len(existing_paths)
+            inserted += len(set(paths)) - len(existing_paths)
+        return inserted, updated
+
+    def upsert_files(self, records):
+        return self._upsert_by_path("files", records)
+
+    def upsert_file_status(self, records):
+        return self._upsert_by_path("file_status", records)
+
+    def insert_server_metrics(self, rows):
+        if rows:
+            self.client.table("server_metrics").insert(rows).execute()
+
+    def recent_server_metrics(self, limit=5000):
+        return (
+            self.client.table("server_metrics")
+            .select("*")
+            .order("recorded_at", desc=True)
+            .limit(limit)
+            .execute()
+            .data
+            or []
+        )
+
+    def insert_events(self, rows):
+        # Needs the UNIQUE ("ServerName", "RecordId") constraint from migrations/001_storage.sql,
+        # matching the SQLite index, so re-sent events are skipped
+        if rows:
+            self.client.table("event_logs").upsert(
+                rows, on_conflict="ServerName,RecordId", ignore_duplicates=True, returning="minimal"
+            ).execute()
+
+    def fetch_unclassified_events(self, limit=100):
+        return (
+            self.client.table("event_logs")
+            .select("*")
+            .is_("classified_at", "null")
+            .not_.is_("RecordId", "null")
+            .order("created_at")
+            .limit(limit)
+            .execute()
+            .data
+            or []
+        )
+
+    def mark_events_classified(self, keys, is_threat):
+        classified_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        by_server = {}
+        for server_name, record_id in keys:
+            by_server.setdefault(server_name, []).append(record_id)
+        for server_name, record_ids in by_server.items():
+            for start in range(0, len(record_ids), SUPABASE_CHUNK_SIZE):
+                (
+                    self.client.table("event_logs")
+                    .update({"is_threat": is_threat, "classified_at": classified_at}, returning="minimal")
+                    .eq("ServerName", server_name)
+                    .in_("RecordId", record_ids[start:start + SUPABASE_CHUNK_SIZE])
+                    .execute()
+                )
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS servers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    ip_address TEXT,
+    mac_address TEXT,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    filename TEXT,
+    size_gb REAL,
+    extension TEXT,
+    created TEXT,
+    last_modified TEXT,
+    last_accessed TEXT,
+    is_system_file INTEGER,
+    drive TEXT,
+    server_id INTEGER,
+    inserted_at TEXT,
+    last_scan TEXT,
+    type TEXT,
+    clip_embedding TEXT
+);
+CREATE TABLE IF NOT EXISTS file_status (
+    path TEXT PRIMARY KEY,
+    server_id INTEGER,
+    deletion_score REAL,
+    duplicate_score REAL,
+    duplicates TEXT,
+    last_updated TEXT
+);
+CREATE TABLE IF NOT EXISTS server_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    server_id INTEGER,
+    cpu REAL,
+    ram REAL,
+    disk REAL,
+    uptime INTEGER,
+    total_disk REAL,
+    recorded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_server_metrics_recorded_at ON server_metrics (recorded_at);
+CREATE INDEX IF NOT EXISTS idx_server_metrics_server_recorded ON server_metrics (server_id, recorded_at);
+-- No surrogate "id": SQLite column names are case-insensitive and would clash with "Id"
+CREATE TABLE IF NOT EXISTS event_logs (
+    ServerName TEXT,
+    RecordId INTEGER,
+    Id INTEGER,
+    LevelDisplayName TEXT,
+    ProviderName TEXT,
+    Message TEXT,
+    is_threat INTEGER DEFAULT 0,
+    created_at TEXT,
+    classified_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_event_logs_record ON event_logs (ServerName, RecordId);
+CREATE INDEX IF NOT EXISTS idx_event_logs_is_threat ON event_logs (is_threat);
+CREATE INDEX IF NOT EXISTS idx_event_logs_unclassified ON event_logs (created_at) WHERE classified_at IS NULL;
+"""
+
+# Columns holding lists/dicts, stored as JSON text in SQLite
+JSON_COLUMNS = {"files": {"clip_embedding"}, "file_status": {"duplicates"}}
+
+
+class SQLiteStorage(Storage):
+    """Local single-file backend; each call is one transaction on a WAL-mode database."""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the scheduler threads, serialized by a lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SQLITE_SCHEMA)
+
+    def _query(self, table, sql, params=()):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        json_columns = JSON_COLUMNS.get(table, set())
+        result = []
+        for row in rows:
+            record = dict(row)
+            for column in json_columns & record.keys():
+                if record[column] is not None:
+                    record[column] = json.loads(record[column])
+            result.append(record)
+        return result
+
+    def _encode(self, table, record):
+        json_columns = JSON_COLUMNS.get(table, set())
+        return {
+            key: json.dumps(value) if key in json_columns and value is not None else value
+            for key, value in record.items()
+        }
+
+    def _insert_many(self, table, rows, conflict="", upsert_key=None):
+        """Writes rows in one transaction, one executemany per distinct column set.
+
+        With `upsert_key`, rows whose key already exists update the given columns instead.
+        """
+        groups = {}
+        for row in rows:
+            row = self._encode(table, row)
+            groups.setdefault(tuple(row), []).append(tuple(row.values()))
+        with self._lock, self._conn:
+            for columns, values in groups.items():
+                column_list = ", ".join(f'"{c}"' for c in columns)
+                placeholders = ", ".join("?" for _ in columns)
+                sql = f"INSERT {conflict} INTO {table} ({column_list}) VALUES ({placeholders})"
+                if upsert_key:
+                    assignments = ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c != upsert_key)
+                    sql += f" ON CONFLICT({upsert_key}) " + (f"DO UPDATE SET {assignments}" if assignments else "DO NOTHING")
+                self._conn.executemany(sql, values)
+
+    def _upsert_by_path(self, table, records):
+        paths = {r["path"] for r in records}
+        existing = set()
+        path_list = list(paths)
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(path_list), 500):
+                chunk = path_list[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                existing.update(
+                    row[0] for row in self._conn.execute(f"SELECT path FROM {table} WHERE path IN ({placeholders})", chunk)
+                )
+        self._insert_many(table, records, upsert_key="path")
+        return len(paths) - len(existing), len(existing)
+
+    def get_or_create_server(self, name):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO servers (name) VALUES (?)", (name,))
+            return self._conn.execute("SELECT id FROM servers WHERE name = ?", (name,)).fetchone()[0]
+
+    def list_servers(self):
+        return self._query("servers", "SELECT id, name FROM servers")
+
+    def list_files(self, columns="*"):
+        if columns != "*":
+            columns = ", ".join(f'"{c.strip()}"' for c in columns.split(","))
+        return self._query("files", f"SELECT {columns} FROM files")
+
+    def upsert_files(self, records):
+        return self._upsert_by_path("files", records)
+
+    def upsert_file_status(self, records):
+        return self._upsert_by_path("file_status", records)
+
+    def insert_server_metrics(self, rows):
+        self._insert_many("server_metrics", rows)
+
+    def recent_server_metrics(self, limit=5000):
+        return self._query(
+            "server_metrics", "SELECT * FROM server_metrics ORDER BY recorded_at DESC LIMIT ?", (limit,)
+        )
+
+    def insert_events(self, rows):
+        # Re-sent events hit the (ServerName, RecordId) index and are skipped
+        self._insert_many("event_logs", rows, conflict="OR IGNORE")
+
+    def fetch_unclassified_events(self, limit=100):
+        return self._query(
+            "event_logs",
+            "SELECT * FROM event_logs WHERE classified_at IS NULL AND RecordId IS NOT NULL "
+            "ORDER BY created_at LIMIT ?",
+            (limit,),
+        )
+
+    def mark_events_classified(self, keys, is_threat):
+        classified_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE event_logs SET is_threat = ?, classified_at = ? WHERE ServerName = ? AND RecordId = ?",
+                [(is_threat, classified_at, server_name, record_id) for server_name, record_id in keys],
+            )
+
+
+def create_storage(backend=None):
+    """Builds the backend named by STORAGE_BACKEND (or `backend`), defaulting to Supabase."""
+    backend = (backend or os.getenv(STORAGE_BACKEND_ENV) or "supabase").lower()
+    if backend == "supabase":
+        return SupabaseStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv(SQLITE_PATH_ENV) or DEFAULT_SQLITE_PATH)
+    raise ValueError(f"Unknown {STORAGE_BACKEND_ENV} '{backend}', expected 'supabase' or 'sqlite'")
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> Storage:
+    """Returns the process-wide storage backend, created on first use."""
+    return create_storage()
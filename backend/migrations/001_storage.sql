@@ -0,0 +1,33 @@
+-- Supabase (Postgres) schema changes required by app/storage.py (SupabaseStorage).
+-- Run once in the Supabase SQL editor; every statement is safe to re-run.
+-- The SQLite backend creates the equivalent schema itself (SQLITE_SCHEMA).
+--
+-- Adding the unique constraints fails if the tables already hold duplicates;
+-- remove them first, e.g. for files:
+--   DELETE FROM files a USING files b WHERE a.path = b.path AND a.ctid < b.ctid;
+
+-- event_logs: (ServerName, RecordId) identifies an event, so re-sent batches are
+-- skipped by insert_events and threat labels are written by mark_events_classified
+ALTER TABLE event_logs ADD COLUMN IF NOT EXISTS "RecordId" bigint;
+ALTER TABLE event_logs ADD COLUMN IF NOT EXISTS classified_at timestamptz;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'event_logs_server_record_key') THEN
+        ALTER TABLE event_logs ADD CONSTRAINT event_logs_server_record_key UNIQUE ("ServerName", "RecordId");
+    END IF;
+END $$;
+
+-- fetch_unclassified_events reads the oldest events not yet scored by the threat model
+CREATE INDEX IF NOT EXISTS idx_event_logs_unclassified ON event_logs (created_at) WHERE classified_at IS NULL;
+
+-- files / file_status: upserted by path (file_collector.py, deletion_decider.py)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'files_path_key') THEN
+        ALTER TABLE files ADD CONSTRAINT files_path_key UNIQUE (path);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'file_status_path_key') THEN
+        ALTER TABLE file_status ADD CONSTRAINT file_status_path_key UNIQUE (path);
+    END IF;
+END $$;
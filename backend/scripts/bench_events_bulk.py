@@ -0,0 +1,91 @@
+import argparse
+import gzip
+import json
+import socket
+import time
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+MESSAGES = [
+    "An account failed to log on.",
+    "An account was successfully logged on.",
+    "A logon was attempted using explicit credentials.",
+    "Special privileges assigned to new logon.",
+    "",
+]
+
+
+def make_batch(start_record_id, size, server_name):
+    """Builds one gzip-compressed NDJSON batch of synthetic Security events."""
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    lines = []
+    for i in range(size):
+        record_id = start_record_id + i
+        lines.append(json.dumps({
+            "ServerName": server_name,
+            "RecordId": record_id,
+            "Id": 4625 if record_id % 3 == 0 else 4624,
+            "LevelDisplayName": "Information",
+            "ProviderName": "Microsoft-Windows-Security-Auditing",
+            "Message": MESSAGES[record_id % len(MESSAGES)],
+            "is_threat": 0,
+            "created_at": now,
+        }))
+    return gzip.compress("\n".join(lines).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for POST /api/events/bulk")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/events/bulk")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--classify", action="store_true")
+    parser.add_argument("--stats-url", default=None, help="defaults to --url with /bulk replaced by /stats")
+    parser.add_argument("--flush-timeout", type=float, default=300, help="seconds to wait for the buffer to drain")
+    parser.add_argument("--server-name", default=f"bench-{socket.gethostname()}-{int(time.time())}")
+    args = parser.parse_args()
+
+    starts = range(1, args.events + 1, args.batch_size)
+    batches = [make_batch(s, min(args.batch_size, args.events - s + 1), args.server_name) for s in starts]
+    headers = {"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+    params = {"classify": "true"} if args.classify else {}
+
+    print(f"🚀 Sending {args.events} events in {len(batches)} batches ({args.concurrency} concurrent)...")
+    stats_url = args.stats_url or args.url.rsplit("/", 1)[0] + "/stats"
+    with httpx.Client(timeout=120) as client:
+        stored_before = client.get(stats_url).json()["inserted_total"]
+
+        def send(body):
+            response = client.post(args.url, content=body, headers=headers, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(send, batches))
+        elapsed = time.perf_counter() - started
+
+        # End to end: wait until everything accepted has been written to storage
+        target = stored_before + sum(r["accepted"] for r in results)
+        stats = client.get(stats_url).json()
+        while stats["inserted_total"] < target and time.perf_counter() - started < elapsed + args.flush_timeout:
+            time.sleep(0.05)
+            stats = client.get(stats_url).json()
+        stored_elapsed = time.perf_counter() - started
+        stored = stats["inserted_total"] - stored_before
+
+    accepted = sum(r["accepted"] for r in results)
+    duplicates = sum(r["duplicates"] for r in results)
+    invalid = sum(r["invalid"] for r in results)
+    print(f"✅ accepted={accepted} duplicates={duplicates} invalid={invalid}")
+    print(f"⏱️ buffered:   {elapsed:.2f}s → {args.events / elapsed:,.0f} events/sec")
+    print(f"⏱️ end to end: {stored_elapsed:.2f}s → {stored / stored_elapsed:,.0f} events/sec ({stored} stored)")
+    if stored < accepted:
+        print(f"⚠️ {accepted - stored} accepted events were not stored within {args.flush_timeout}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, for app.storage
+from app.storage import create_storage
+
+
+def timed(label, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"⏱️ {label:<32} {elapsed * 1000:9.1f} ms")
+    return result
+
+
+def make_files(count, server_id, now):
+    return [
+        {
+            "filename": f"file_{i}.txt",
+            "path": f"/bench/{server_id}/dir_{i % 100}/file_{i}.txt",
+            "size_gb": random.random() / 1024,
+            "extension": ".txt",
+            "created": now,
+            "last_modified": now,
+            "last_accessed": now,
+            "is_system_file": False,
+            "drive": "",
+            "server_id": server_id,
+            "inserted_at": now,
+            "last_scan": now,
+            "type": "file",
+            "clip_embedding": None,
+        }
+        for i in range(count)
+    ]
+
+
+def make_metrics(count, server_id):
+    start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=count)
+    return [
+        {
+            "server_id": server_id,
+            "cpu": random.uniform(0, 100),
+            "ram": random.uniform(0, 100),
+            "disk": random.uniform(0, 100),
+            "uptime": i * 60,
+            "total_disk": 500.0,
+            "recorded_at": (start + datetime.timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def make_events(count, server_name, now):
+    return [
+        {
+            "ServerName": server_name,
+            "RecordId": i,
+            "Id": 4625 if i % 3 == 0 else 4624,
+            "LevelDisplayName": "Information",
+            "ProviderName": "Microsoft-Windows-Security-Auditing",
+            "Message": "An account failed to log on.",
+            "is_threat": 0,
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the storage operations used by the pipeline scripts")
+    parser.add_argument("--backend", choices=["sqlite", "supabase"], default="sqlite")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--metrics", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.backend == "sqlite" and not os.getenv("SQLITE_PATH"):
+        # Fresh throwaway database unless SQLITE_PATH points somewhere explicit
+        os.environ["SQLITE_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+    storage = create_storage(args.backend)
+    print(f"🚀 Benchmarking {type(storage).__name__}")
+
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    server_id = timed("get_or_create_server", storage.get_or_create_server, f"bench-{int(time.time())}")
+    files = make_files(args.files, server_id, now)
+    statuses = [{"path": f["path"], "server_id": server_id, "last_updated": now} for f in files]
+
+    timed(f"upsert_files (insert {args.files})", storage.upsert_files, files)
+    timed(f"upsert_files (update {args.files})", storage.upsert_files, files)
+    timed(f"upsert_file_status ({args.files})", storage.upsert_file_status, statuses)
+    timed("list_files", storage.list_files, "path, filename, last_scan, clip_embedding, server_id")
+    timed(f"insert_server_metrics ({args.metrics})", storage.insert_server_metrics, make_metrics(args.metrics, server_id))
+    timed("recent_server_metrics (5000)", storage.recent_server_metrics, 5000)
+    timed(f"insert_events ({args.events})", storage.insert_events, make_events(args.events, f"bench-{server_id}", now))
+    timed("fetch_unclassified_events (10000)", storage.fetch_unclassified_events, 10000)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,12 @@
 import os
-from dotenv import load_dotenv
+import sys
 from pathlib import Path
-from supabase import create_client, Client
 import datetime
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import re
-
-# Load environment variables
-load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env.local")
-SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY") or os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Supabase credentials not found in .env.local")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, for app.storage
+from app.storage import get_storage, Storage
 
 
 def calculate_deletion_score(filepath: str, filename: str, last_accessed_iso: str) -> float:
@@ -62,11 +55,8 @@ def calculate_deletion_score(filepath: str, filename: str, last_accessed_iso: st
     return max(0.0, min(100.0, normalized))
 
 
-def fetch_files():
-    response = supabase.table("files") \
-                       .select("path, filename, last_scan, clip_embedding, server_id") \
-                       .execute()
-    return response.data or []
+def fetch_files(storage: Storage):
+    return storage.list_files("path, filename, last_scan, clip_embedding, server_id")
 
 
 def calculate_duplicates(files_data):
@@ -92,7 +82,8 @@ def calculate_duplicates(files_data):
     return duplicates
 
 
-def update_file_status(files_data, duplicates_dict):
+def update_file_status(storage: Storage, files_data, duplicates_dict):
+    records = []
     for f in files_data:
         path = f["path"]
         filename = f.get("filename", os.path.basename(path))
@@ -123,27 +114,20 @@ def update_file_status(files_data, duplicates_dict):
             ).isoformat(),
         }
 
-        existing = (
-            supabase.table("file_status")
-            .select("path")
-            .eq("path", path)
-            .execute()
-        )
-        if existing.data:
-            supabase.table("file_status").update(record).eq("path", path).execute()
-            print(f"✅ Updated file_status for {path}")
-        else:
-            record["path"] = path
-            record["server_id"] = f.get("server_id")
-            supabase.table("file_status").insert(record).execute()
-            print(f"➕ Inserted file_status for {path}")
-
-
-
-def main():
-    files = fetch_files()
+        record["path"] = path
+        record["server_id"] = f.get("server_id")
+        records.append(record)
+
+    inserted, updated = storage.upsert_file_status(records)
+    print(f"✅ file_status: {inserted} inserted, {updated} updated")
+
+
+def main(storage: Storage = None):
+    storage = storage or get_storage()
+    files = fetch_files(storage)
     duplicates = calculate_duplicates(files)
-    update_file_status(files, duplicates)
+    update_file_status(storage, files, duplicates)
+    return len(files)
 
 
 if __name__ == "__main__":
@@ -4,28 +4,14 @@ import socket
 import datetime
 import platform
 from pathlib import Path
-from supabase import create_client, Client
-from dotenv import load_dotenv
 import sys
 from PIL import UnidentifiedImageError  # Handle corrupted images
 from duplicate_scanner_model import get_image_embedding  # type: ignore
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, for app.storage
+from app.storage import get_storage, Storage
 
-# Load environment variables
-load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env.local")
-SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY") or os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Supabase credentials not found in .env.local")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-def get_server_id_from_hostname():
-    hostname = socket.gethostname()
-    response = supabase.table("servers").select("id").eq("name", hostname).execute()
-    if response.data:
-        return response.data[0]["id"]
-    else:
-        insert_response = supabase.table("servers").insert({"name": hostname}).execute()
-        return insert_response.data[0]["id"]
+def get_server_id_from_hostname(storage: Storage):
+    return storage.get_or_create_server(socket.gethostname())
 
 def get_folder_size(folder_path: Path) -> float:
     total_size = 0
@@ -105,28 +91,26 @@ def collect_file_metadata(directory: str, server_id: int):
                 print(f"Erreur dossier {folder}: {e}")
     return file_records
 
-def upsert_to_supabase(records):
-    for record in records:
-        existing = supabase.table("files").select("path").eq("path", record["path"]).execute()
-        if existing.data:
-            supabase.table("files").update(record).eq("path", record["path"]).execute()
-            print(f"✅ Updated files: {record['filename']}")
-        else:
-            supabase.table("files").insert(record).execute()
-            print(f"➕ Inserted files: {record['filename']}")
+def upsert_records(storage: Storage, records):
+    inserted, updated = storage.upsert_files(records)
+    print(f"✅ files: {inserted} inserted, {updated} updated")
+
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    status_records = [
+        {"path": record["path"], "server_id": record["server_id"], "last_updated": now}
+        for record in records
+    ]
+    inserted, updated = storage.upsert_file_status(status_records)
+    print(f"✅ file_status: {inserted} inserted, {updated} updated")
 
-        status_record = {
-            "path": record["path"],
-            "server_id": record["server_id"],
-            "last_updated": datetime.datetime.now(datetime.timezone.utc).isoformat()
-        }
-        existing_status = supabase.table("file_status").select("path").eq("path", record["path"]).execute()
-        if existing_status.data:
-            supabase.table("file_status").update(status_record).eq("path", record["path"]).execute()
-            print(f"✅ Updated file_status: {record['filename']}")
-        else:
-            supabase.table("file_status").insert(status_record).execute()
-            print(f"➕ Inserted file_status: {record['filename']}")
+def run(folder_to_scan: str, storage: Storage = None):
+    """Scans a folder and upserts its files; reuses the given storage when called in-process."""
+    storage = storage or get_storage()
+    print(f"Scanning folder: {folder_to_scan}")
+    server_id = get_server_id_from_hostname(storage)
+    collected = collect_file_metadata(folder_to_scan, server_id)
+    upsert_records(storage, collected)
+    return len(collected)
 
 if __name__ == "__main__":
     # ➊ Get initial path (from argv or None)
@@ -141,9 +125,6 @@ if __name__ == "__main__":
         print(f"❌ Error: '{folder_to_scan}' is not a valid directory.")
         folder_to_scan = None  # force re-prompt
 
-    print(f"Scanning folder: {folder_to_scan}")
-    server_id = get_server_id_from_hostname()
-    collected = collect_file_metadata(folder_to_scan, server_id)
-    upsert_to_supabase(collected)
+    run(folder_to_scan)
 
     print("\n✅ Scan completed. Data added to database.")
@@ -5,22 +5,10 @@ import json
 
 from sklearn.linear_model import LinearRegression
 from datetime import datetime, timedelta, timezone
-from supabase import create_client, Client
-from dotenv import load_dotenv
 from pathlib import Path
-
-
-def get_supabase_client():
-    env_path = Path(__file__).resolve().parents[2] / ".env.local"  # ✅ one level up
-    load_dotenv(dotenv_path=env_path)
-
-    SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-    SUPABASE_KEY = os.getenv("SUPABASE_KEY") or os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        raise ValueError("Supabase credentials not found in .env.local")
-
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # backend/, for app.storage
+from app.storage import get_storage, Storage
 
 
 def forecast(series):
@@ -37,14 +25,11 @@ def forecast(series):
     return model.predict(X_future).flatten()
 
 
-def run_forecast():
-    supabase = get_supabase_client()
-
-    metrics_resp = supabase.table("server_metrics").select("*").order("recorded_at", desc=True).limit(5000).execute()
-    servers_resp = supabase.table("servers").select("id, name").execute()
+def run_forecast(storage: Storage = None):
+    storage = storage or get_storage()
 
-    metrics_df = pd.DataFrame(metrics_resp.data)
-    servers_df = pd.DataFrame(servers_resp.data)
+    metrics_df = pd.DataFrame(storage.recent_server_metrics(limit=5000))
+    servers_df = pd.DataFrame(storage.list_servers())
 
     print("📦 Metrics rows:", len(metrics_df))
     print("🖥️ Servers rows:", len(servers_df))
@@ -108,12 +93,31 @@ def run_forecast():
     print(f"\n📤 Final forecast result count: {len(results)}")
     return results
 
-if __name__ == "__main__":
-    results = run_forecast()
+# The frontend (app/api/security/route.ts) reads this file; FORECAST_OUTPUT_PATH moves it out of the source tree
+OUTPUT_PATH = Path(os.getenv("FORECAST_OUTPUT_PATH") or Path(__file__).resolve().parent / "forecast_results.json")
 
-    output_path = Path(__file__).resolve().parent / "forecast_results.json"
 
-    with open(output_path, "w") as f:
+def save_results(results, output_path=OUTPUT_PATH):
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so readers never see a half-written file
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    with open(tmp_path, "w") as f:
         json.dump(results, f, indent=2)
+    os.replace(tmp_path, output_path)
+
+    print(f"\n💾 Forecast results saved to: {output_path}")
+    return output_path
+
 
-    print(f"\n💾 Forecast results saved to: {output_path}")
\ No newline at end of file
+def main(storage: Storage = None):
+    results = run_forecast(storage)
+    if not results:
+        # Keep the last real forecast rather than replacing it with []
+        print("\n⚠️ No forecast produced, keeping the previous results file.")
+        return 0
+    save_results(results)
+    return len(results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
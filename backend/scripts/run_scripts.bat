@@ -1,4 +1,7 @@
 @echo off
-python "C:\Users\mira\Downloads\version6\backend\scripts\is_threat.py"
-python "C:\Users\mira\Downloads\version6\backend\scripts\forecast.py"
+REM The pipeline (file_collector, deletion_decider, is_threat, forecast) now runs
+REM as scheduled jobs inside the backend; see /api/jobs for their status.
+REM Set FILE_COLLECTOR_PATH to the folder to scan to enable the file collector.
+cd /d "%~dp0.."
+python -m uvicorn app.main:app --host 0.0.0.0 --port 8000
 pause